@@ -1,6 +1,6 @@
 'use client';
 
-import { useState } from 'react';
+import { useCallback, useEffect, useState } from 'react';
 import { Bot, Send, Lightbulb, TrendingUp, Target, Sparkles } from 'lucide-react';
 
 interface AIAgentProps {
@@ -21,11 +21,16 @@ interface SuggestionsResponse {
   priority: string;
 }
 
+// Suggestions are generated by a background batch job; poll until they are ready
+const SUGGESTIONS_POLL_INTERVAL_MS = 15000;
+
 export default function AIAgent({ productId, productName }: AIAgentProps) {
   const [query, setQuery] = useState('');
   const [agentResponse, setAgentResponse] = useState<AgentResponse | null>(null);
   const [suggestions, setSuggestions] = useState<SuggestionsResponse | null>(null);
   const [loading, setLoading] = useState(false);
+  // Bumped when a background poll fails, so the poll effect re-arms even though suggestions didn't change
+  const [pollFailures, setPollFailures] = useState(0);
   const [activeTab, setActiveTab] = useState<'chat' | 'suggestions'>('chat');
 
   const handleAgentQuery = async () => {
@@ -66,20 +71,28 @@ export default function AIAgent({ productId, productName }: AIAgentProps) {
     }
   };
 
-  const loadSuggestions = async () => {
-    setLoading(true);
+  const loadSuggestions = useCallback(async (background = false) => {
+    if (!background) setLoading(true);
     try {
       const response = await fetch(`http://localhost:8000/agent/suggestions/${productId}`);
       if (response.ok) {
         const data = await response.json();
         setSuggestions(data);
+        return;
       }
     } catch (error) {
       console.error('Suggestions failed:', error);
     } finally {
-      setLoading(false);
+      if (!background) setLoading(false);
     }
-  };
+    if (background) setPollFailures((count) => count + 1);
+  }, [productId]);
+
+  useEffect(() => {
+    if (suggestions?.priority !== 'pending') return;
+    const timer = setTimeout(() => loadSuggestions(true), SUGGESTIONS_POLL_INTERVAL_MS);
+    return () => clearTimeout(timer);
+  }, [suggestions, pollFailures, loadSuggestions]);
 
   const getPriorityColor = (priority: string) => {
     switch (priority) {
@@ -197,6 +210,12 @@ export default function AIAgent({ productId, productName }: AIAgentProps) {
             <div className="flex items-center justify-center py-8">
               <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-600"></div>
             </div>
+          ) : suggestions?.priority === 'pending' ? (
+            <div className="text-center py-8 text-gray-500">
+              <Sparkles className="h-8 w-8 mx-auto mb-2 text-gray-400 animate-pulse" />
+              <p>Generating suggestions for {productName}...</p>
+              <p className="text-xs mt-1">This can take a few minutes; they will appear here automatically.</p>
+            </div>
           ) : suggestions ? (
             <div className="space-y-3">
               <div className="flex items-center justify-between mb-4">